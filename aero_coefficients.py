@@ -27,13 +27,13 @@ email: bernamdc@gmail.com
 """
 
 import os
+import functools
 import numpy as np
 import pandas as pd
-from aerodynamic_coefficients.polynomial_fit import cons_poly_fit
+from aerodynamic_coefficients.polynomial_fit import cons_poly_fit_coef, cons_poly_eval, poly_coeff_matrix, cons_poly_eval_matrix
 from transformations import T_LnwLs_func, theta_yz_bar_func, T_LsGw_func
 from my_utils import root_dir, deg, rad
 from scipy import interpolate
-import copy
 
 
 lst_methods = ['cos_rule', 'hybrid', 'table', '2D_fit_free', '2D_fit_cons', '2D_fit_cons_scale_to_Jul',
@@ -50,6 +50,40 @@ lst_methods = ['cos_rule', 'hybrid', 'table', '2D_fit_free', '2D_fit_cons', '2D_
 Cx_factor = 2.0  # To make CFD results conservative, better match SOH and reflect friction and other bridge equipment
 Cy_factor = 1.0  # MAKE SURE IF THIS HAS ALREADY BEEN DONE IN THE CSV FILE "aero_coef_experimental_data.csv"   # 4.0 / 3.5  # H has increased from 3.5 to 4.0 in Phase 7 of the BJF project, but since Cy is normalized by B, this is overlooked...
 
+# Folder with the tables of aerodynamic coefficients (see the table methods, e.g. 'aero_coefs_in_Ls_from_SOH_CFD_scaled_to_Julsund.xlsx')
+tables_dir = os.path.join(root_dir, 'aerodynamic_coefficients', 'tables')
+
+# Frequently used angles [rad]
+rad_90 = np.pi / 2
+rad_180 = np.pi
+
+# Bounds of the domain of the polynomial fits, in the 1st quadrant: [[beta bounds], [theta bounds]]
+data_bounds = np.array([[0, np.pi / 2], [-np.pi / 2, np.pi / 2]])
+
+# Default degrees of the polynomial fits of each method (for Cx, Cy, Cz, Cxx, Cyy, Czz)
+default_degree_list = {'2D_fit_free':[2,2,1,1,3,4], '2D_fit_cons':[3,4,4,4,4,4],
+                       '2D_fit_cons_scale_to_Jul':[3,4,4,4,4,4], '2D_fit_cons_w_CFD_scale_to_Jul':[3,4,4,5,4,4],
+                       '2D_fit_cons_polimi-K12-G-L-TS-SVV':[9,9,9,9,9,9], '2D_fit_free_polimi':[4,4,4,4,4,4],
+                       '2D_fit_cons_polimi-K12-G-L-T1-SVV':[9,9,9,9,9,9],
+                       '2D_fit_cons_polimi-K12-G-L-T3-SVV':[9,9,9,9,9,9],
+                       '2D_fit_cons_polimi-K12-G-L-CS-SVV':[9,9,9,9,9,9],
+                       '2D_fit_cons_polimi-K12-G-L-SVV':[9,9,9,9,9,9]}  # constr_fit_adjusted_degree_list=[3,5,5,5,4,4]  BEST FIT FOR '2D_fit_cons_polimi' is [7,9,7,7,-,-]
+
+# Constraints of the '2D_fit_cons' methods, in Ls coordinates, for Cx, Cy, Cz, Cxx, Cyy, Czz.
+# The constraints are reasoned for a 0-90 deg interval, but applicable to a -180 to 180 deg interval when the symmetry signs (see C_signs_per_quadrant) are also used.
+fit_cons_ineq_constraints = [False,  # Cx. False or 'positivity' or 'negativity'
+                             False,  # Cy
+                             False,  # Cz. We could have: dF/dx1_is_positive_at_x0_end', but difficult to implement with little gain.
+                             False,  # Cxx
+                             False,  # Cyy
+                             False]  # Czz
+fit_cons_other_constraints = [['F_is_0_at_x0_start', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_end'],  # Cx
+                              ['F_is_0_at_x0_end', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_start', 'dF/dx0_is_0_at_x0_end_at_x1_middle'],  # Cy. , 'F_is_0p13_at_x0_start_at_x1_middle']
+                              ['F_is_0_at_x0_end_at_x1_middle', 'dF/dx0_is_0_at_x0_start', 'dF/dx0_is_0_at_x0_end', 'F_is_CFD_at_x0_end_at_x1_-10', 'F_is_CFD_at_x0_end_at_x1_10'],  # Cz. , 'F_is_-2_at_x1_start', 'F_is_2_at_x1_end']  # , 'dF/dx1_is_16p4_at_x0_start_at_x1_middle', 'F_is_-0p19_at_x0_start_at_x1_middle'], # can eventually remove derivative constraint
+                              ['F_is_0_at_x0_end', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_start', 'dF/dx0_is_0_at_x0_end_at_x1_middle'],  # Cxx. 'dF/dx0_is_0_at_x0_start'
+                              ['F_is_0_at_x0_start', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_end'],  # Cyy
+                              ['F_is_0_at_x0_start', 'F_is_0_at_x0_end', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end']]  # Czz
+
 # Converting to L.D. Zhu "beta" and "theta" definition. Points are no longer in a regular grid. Angles are converted to a [-180,180] deg interval
 def from_SOH_to_Zhu_angles(betas_uncorrected, alphas):
     # DEPRECATED FUNCTION. SEE INSTEAD: transformations.beta_theta_from_beta_rx0_and_rx
@@ -174,92 +208,160 @@ def df_aero_coef_measurement_data(method):
     return df
 
 
+@functools.lru_cache(maxsize=None)
+def aero_coef_measurement_data_in(method):
+    """
+    Measurement data from df_aero_coef_measurement_data(method), as the data_in arrays used in the polynomial fits.
+    Returns an array with shape (6, 3, n_data): for each coefficient Cx, Cy, Cz, Cxx, Cyy, Czz (in Ls), the rows are [betas, thetas, C].
+    The files are only read once per method. The cached array is read-only and should not be modified.
+    """
+    df = df_aero_coef_measurement_data(method)
+    betas_SOH = rad(df['beta[deg]'].to_numpy(dtype=float))
+    thetas_SOH = rad(df['theta[deg]'].to_numpy(dtype=float))
+    data_in = np.array([[betas_SOH, thetas_SOH, df[C_name].to_numpy(dtype=float)]
+                        for C_name in ['Cx_Ls', 'Cy_Ls', 'Cz_Ls', 'Cxx_Ls', 'Cyy_Ls', 'Czz_Ls']])
+    data_in.flags.writeable = False
+    return data_in
+
+
+@functools.lru_cache(maxsize=None)
+def aero_coef_measurement_data_in_beta_0_strip(method):
+    """
+    The same as aero_coef_measurement_data_in(method), but only with the first 5 data points (the beta=0 strip), as a contiguous array.
+    """
+    data_in = np.ascontiguousarray(aero_coef_measurement_data_in(method)[:, :, :5])
+    data_in.flags.writeable = False
+    return data_in
+
+
+@functools.lru_cache(maxsize=None)
+def aero_coef_poly_coef(method, C_idx, degree, ineq_constraint, other_constraint, degree_type, beta_0_strip=False):
+    """
+    Polynomial coefficients fitted to the measurement data of one aerodynamic coefficient (C_idx = 0,1,...,5 for Cx,Cy,Cz,Cxx,Cyy,Czz).
+    The (slow) fit only depends on the data and on the fit parameters, not on where it is evaluated, so it is cached.
+    other_constraint needs to be hashable (a tuple, or False). beta_0_strip=True uses only the beta=0 strip (see aero_coef_measurement_data_in_beta_0_strip).
+    """
+    if beta_0_strip:
+        data_in = aero_coef_measurement_data_in_beta_0_strip(method)[C_idx]
+    else:
+        data_in = aero_coef_measurement_data_in(method)[C_idx]
+    poly_coeff = cons_poly_fit_coef(data_in, data_bounds, degree, ineq_constraint, list(other_constraint) if other_constraint else False, degree_type)
+    poly_coeff.flags.writeable = False
+    return poly_coeff
+
+
+def aero_coef_poly_fit(method, C_idx, data_coor_out, degree, ineq_constraint, other_constraint, degree_type, beta_0_strip=False):
+    """
+    The same as cons_poly_fit(...)[1] with the measurement data of the method, but fitting only once (see aero_coef_poly_coef).
+    """
+    if other_constraint:
+        other_constraint = tuple(other_constraint)
+    poly_coeff = aero_coef_poly_coef(method, C_idx, degree, ineq_constraint, other_constraint, degree_type, beta_0_strip)
+    return cons_poly_eval(poly_coeff, data_coor_out, data_bounds, degree)
+
+
+def aero_coef_poly_coef_all(method, degrees, ineq_constraints, other_constraints, degree_type):
+    """
+    The (cached) aero_coef_poly_coef of all 6 coefficients (lists of degrees and constraints with length 6).
+    """
+    return [aero_coef_poly_coef(method, C_idx, degrees[C_idx], ineq_constraints[C_idx],
+                                tuple(other_constraints[C_idx]) if other_constraints[C_idx] else other_constraints[C_idx], degree_type)
+            for C_idx in range(6)]
+
+
+class AeroCoefEvaluator:
+    """
+    The polynomial fits of one '2D_fit_free...' or '2D_fit_cons...' method, with the given degrees (for Cx, Cy, Cz, Cxx, Cyy, Czz),
+    prepared once and then evaluated at any number of points. The 6 polynomials are fitted and stacked in one matrix, so that each
+    evaluation is only one Vandermonde matrix product. Use aero_coef_evaluator(...) to reuse the same evaluator between calls.
+    """
+    def __init__(self, method, degrees):
+        if '2D_fit_cons' in method:
+            ineq_constraints, other_constraints = fit_cons_ineq_constraints, fit_cons_other_constraints
+        elif '2D_fit_free' in method:
+            ineq_constraints, other_constraints = [False] * 6, [False] * 6
+        else:
+            raise ValueError('AeroCoefEvaluator only covers the methods 2D_fit_free and 2D_fit_cons (and their variants)')
+        self.method = method
+        self.degrees = list(degrees)
+        poly_coeff_list = aero_coef_poly_coef_all(method, self.degrees, ineq_constraints, other_constraints, degree_type='max')
+        self.poly_coeff_matrix, self.max_degree = poly_coeff_matrix(poly_coeff_list, self.degrees, n_ind_var=2)
+        self.poly_coeff_matrix.flags.writeable = False
+
+    def evaluate_1st_quadrant(self, data_coor_out):
+        """
+        data_coor_out: [betas, thetas], with all betas already in [0, 90] deg (see get_C_signs_and_change_betas_extrap).
+        Returns C_Ci_Ls without the signs of the other quadrants, with shape (6, n_out_data)
+        """
+        return cons_poly_eval_matrix(self.poly_coeff_matrix, self.max_degree, data_coor_out, data_bounds)
+
+    def evaluate(self, betas, thetas):
+        """
+        The same as aero_coef(betas, thetas, method, coor_system='Ls'). Returns C_Ci_Ls, with shape (6, size)
+        """
+        betas, thetas = aero_coef_input_check(betas, thetas)
+        betas, C_signs = get_C_signs_and_change_betas_extrap(betas)
+        C_Ci_Ls = self.evaluate_1st_quadrant(np.array([betas, thetas]))
+        C_Ci_Ls *= C_signs
+        return C_Ci_Ls
+
+
+@functools.lru_cache(maxsize=None)
+def aero_coef_evaluator(method, degrees):
+    """
+    The AeroCoefEvaluator of the method, built only once per method and degrees (a tuple, e.g. tuple(degree_list[method]))
+    """
+    return AeroCoefEvaluator(method, degrees)
+
+
+# Quadrants of beta: 0 <=> [0,90], 1 <=> ]90,180], 2 <=> [-90,0[, 3 <=> [-180,-90[. (4 <=> outside [-180,180], should not happen)
+# Each quadrant is folded into the 1st quadrant as beta_folded = a * beta + b, with the following [a, b]:
+beta_folding_per_quadrant = np.array([[1., -1., -1., 1., 1.],
+                                      [0., np.pi, 0., np.pi, 0.]])
+# Signs for axes in Ls (rows: Cx, Cy, Cz, Cxx, Cyy, Czz), that conserve the fact that beta was in another quadrant (columns)
+C_signs_per_quadrant = np.array([[1.,  1., -1., -1., 0.],
+                                 [1., -1.,  1., -1., 0.],
+                                 [1.,  1.,  1.,  1., 0.],
+                                 [1., -1.,  1., -1., 0.],
+                                 [1.,  1., -1., -1., 0.],
+                                 [1., -1., -1.,  1., 0.]])
+
+
 def get_C_signs_and_change_betas_extrap(betas_extrap):
     # Converting all [-180,180] angles into equivalent [0,90] angles. The sign information outside [0,90] is lost and stored manually for each coefficient. Assumes symmetric cross-section.
-    size = len(betas_extrap)
-    Cx_sign, Cy_sign, Cz_sign, Cxx_sign, Cyy_sign, Czz_sign = np.zeros((6, size))
-    # Signs for axes in Ls.
-    for b in range(size):
-        if rad(0) <= betas_extrap[b] <= rad(90):  # all other intervals will be transformations to this one
-            Cx_sign[b] = 1
-            Cy_sign[b] = 1
-            Cz_sign[b] = 1
-            Cxx_sign[b] = 1
-            Cyy_sign[b] = 1
-            Czz_sign[b] = 1
-        elif rad(90) < betas_extrap[b] <= rad(180):
-            betas_extrap[b] = rad(180) - betas_extrap[b]  # if beta = 110, then becomes 180-110=70
-            # the following signs will conserve the fact that beta was in another quadrant.
-            Cx_sign[b] = 1
-            Cy_sign[b] = -1
-            Cz_sign[b] = 1
-            Cxx_sign[b] = -1
-            Cyy_sign[b] = 1
-            Czz_sign[b] = -1
-        elif -rad(90) <= betas_extrap[b] < 0:
-            betas_extrap[b] = -betas_extrap[b]  # if beta = -60, then becomes 60
-            # the following signs will conserve the fact that beta was in another quadrant.
-            Cx_sign[b] = -1
-            Cy_sign[b] = 1
-            Cz_sign[b] = 1
-            Cxx_sign[b] = 1
-            Cyy_sign[b] = -1
-            Czz_sign[b] = -1
-        elif -rad(180) <= betas_extrap[b] < -rad(90):
-            betas_extrap[b] = rad(180) + betas_extrap[b]  # if beta = -160, then becomes 180+(-160)=20
-            # the following signs will conserve the fact that beta was in another quadrant.
-            Cx_sign[b] = -1
-            Cy_sign[b] = -1
-            Cz_sign[b] = 1
-            Cxx_sign[b] = -1
-            Cyy_sign[b] = -1
-            Czz_sign[b] = 1
-    return betas_extrap, Cx_sign, Cy_sign, Cz_sign, Cxx_sign, Cyy_sign, Czz_sign
-
-
-def get_C_signs_and_change_betas_NEW(betas):
-    # todo: Bernardo check if we can use this function instead of the one above. It's vectorized, so should be faster
-    # Ensure betas is a NumPy array
-    betas = np.asarray(betas)
-
-    # Initialize sign arrays
-    signs = np.ones((6, betas.size))  # Shape (6, size) for Cx, Cy, Cz, Crx, Cry, Crz
-
-    # Define masks for different beta quadrants
-    mask_90_180 = (betas > rad(90)) & (betas <= rad(180))
-    mask_neg90_0 = (betas >= -rad(90)) & (betas < 0)
-    mask_neg180_neg90 = (betas >= -rad(180)) & (betas < -rad(90))
-
-    # Transform betas and update signs
-    betas[mask_90_180] = rad(180) - betas[mask_90_180]
-    signs[:, mask_90_180] = [[1], [-1], [1], [-1], [1], [-1]]
-
-    betas[mask_neg90_0] = -betas[mask_neg90_0]
-    signs[:, mask_neg90_0] = [[-1], [1], [1], [1], [-1], [-1]]
-
-    betas[mask_neg180_neg90] = rad(180) + betas[mask_neg180_neg90]
-    signs[:, mask_neg180_neg90] = [[-1], [-1], [1], [-1], [-1], [1]]
-
-    return (betas,) + tuple(signs)
-
+    betas_extrap = np.asarray(betas_extrap)
+    # Classifying each beta in a quadrant. The 1st quadrant is the reference, all other intervals will be transformations to this one
+    quadrant = np.select([(0 <= betas_extrap) & (betas_extrap <= rad_90),
+                          (rad_90 < betas_extrap) & (betas_extrap <= rad_180),
+                          (-rad_90 <= betas_extrap) & (betas_extrap < 0),
+                          (-rad_180 <= betas_extrap) & (betas_extrap < -rad_90)], [0, 1, 2, 3], default=4)
+    # e.g. if beta = 110, then becomes 180-110=70. If beta = -60, then becomes 60. If beta = -160, then becomes 180+(-160)=20
+    fold_a, fold_b = beta_folding_per_quadrant[:, quadrant]
+    betas_extrap = fold_a * betas_extrap + fold_b
+    # Signs for axes in Ls (rows: Cx, Cy, Cz, Cxx, Cyy, Czz), all obtained at once with shape (6, size)
+    C_signs = C_signs_per_quadrant[:, quadrant]
+    return betas_extrap, C_signs
 
 
 def aero_coef_table_method(betas_extrap, thetas_extrap, method, coor_system):
     assert coor_system in ['Ls', 'Gw']
-    table_path = os.path.join(root_dir, 'aerodynamic_coefficients', 'tables', method)
-    betas_table = np.deg2rad(pd.read_excel(table_path, header=None, sheet_name='betas_deg').to_numpy())
-    thetas_table = np.deg2rad(pd.read_excel(table_path, header=None, sheet_name='thetas_deg').to_numpy())
+    table_path = os.path.join(tables_dir, method)
     if coor_system == 'Ls':
         sheet_names = ['Cx', 'Cy', 'Cz', 'Crx', 'Cry', 'Crz']
     elif coor_system == 'Gw':
         sheet_names = ['CXu', 'CYv', 'CZw', 'CrXu', 'CrYv', 'CrZw']
-    C_Ci_Ls_table = np.array([
-        pd.read_excel(table_path, header=None, sheet_name=sheet_names[0]).to_numpy(),
-        pd.read_excel(table_path, header=None, sheet_name=sheet_names[1]).to_numpy(),
-        pd.read_excel(table_path, header=None, sheet_name=sheet_names[2]).to_numpy(),
-        pd.read_excel(table_path, header=None, sheet_name=sheet_names[3]).to_numpy(),
-        pd.read_excel(table_path, header=None, sheet_name=sheet_names[4]).to_numpy(),
-        pd.read_excel(table_path, header=None, sheet_name=sheet_names[5]).to_numpy()])
+    # The .npz file with the same name (written by print_table_of_aerodynamic_coefficients.py) is much faster to read than the xlsx.
+    # It is only used if it is at least as new as the xlsx, so that a regenerated or edited xlsx is never overridden by an older .npz
+    npz_path = os.path.splitext(table_path)[0] + '.npz'
+    if os.path.isfile(npz_path) and (not os.path.isfile(table_path) or os.path.getmtime(npz_path) >= os.path.getmtime(table_path)):
+        with np.load(npz_path) as npz:
+            tables = {name: npz[name] for name in ['betas_deg', 'thetas_deg'] + sheet_names}
+    else:  # all sheets are read in one go, parsing the xlsx file only once
+        tables = {name: df.to_numpy() for name, df in
+                  pd.read_excel(table_path, header=None, sheet_name=['betas_deg', 'thetas_deg'] + sheet_names).items()}
+    betas_table = np.deg2rad(tables['betas_deg'])
+    thetas_table = np.deg2rad(tables['thetas_deg'])
+    C_Ci_Ls_table = np.array([tables[name] for name in sheet_names])
     # NOTE THAT THE TABLE SHOULD BE C_Ci_Ls_table[:,::-1,:] SINCE THE THETAS WERE, IN THE ORIGINAL TABLE, IN DESCENDING ORDER, BUT ARE FORCED BY RectBivariateSpline to be ascending
     C_C0_func = interpolate.RectBivariateSpline(np.unique(betas_table), np.unique(thetas_table),
                                                 np.moveaxis(C_Ci_Ls_table[:, ::-1, :], 1, 2)[0], kx=1, ky=1)
@@ -284,14 +386,25 @@ def aero_coef_table_method(betas_extrap, thetas_extrap, method, coor_system):
     return C_Ci_Ls_table_interp
 
 
-def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
-              degree_list={'2D_fit_free':[2,2,1,1,3,4], '2D_fit_cons':[3,4,4,4,4,4],
-                           '2D_fit_cons_scale_to_Jul':[3,4,4,4,4,4], '2D_fit_cons_w_CFD_scale_to_Jul':[3,4,4,5,4,4],
-                           '2D_fit_cons_polimi-K12-G-L-TS-SVV':[9,9,9,9,9,9], '2D_fit_free_polimi':[4,4,4,4,4,4],
-                           '2D_fit_cons_polimi-K12-G-L-T1-SVV':[9,9,9,9,9,9],
-                           '2D_fit_cons_polimi-K12-G-L-T3-SVV':[9,9,9,9,9,9],
-                           '2D_fit_cons_polimi-K12-G-L-CS-SVV':[9,9,9,9,9,9],
-                           '2D_fit_cons_polimi-K12-G-L-SVV':[9,9,9,9,9,9]}):  # constr_fit_adjusted_degree_list=[3,5,5,5,4,4]  BEST FIT FOR '2D_fit_cons_polimi' is [7,9,7,7,-,-]
+def aero_coef_input_check(betas_extrap, thetas_extrap):
+    """
+    Data error checks of the betas and thetas given to aero_coef. Returns float copies of both.
+    """
+    # Plain array copies (much faster than copy.deepcopy), so that the input arrays are never modified by aero_coef
+    betas_extrap = np.array(betas_extrap, dtype=float)
+    thetas_extrap = np.array(thetas_extrap, dtype=float)
+    if np.any(np.abs(thetas_extrap) > rad_90):
+        raise ValueError('At least one theta is outside [-90,90] deg (in radians)')
+    if np.any(np.abs(betas_extrap) > rad_180):
+        raise ValueError('At least one beta is outside [-180,180] deg (in radians)')
+    if betas_extrap.size != thetas_extrap.size:
+        raise ValueError('Both arrays need to have same size')
+    if betas_extrap.ndim != 1 or thetas_extrap.ndim != 1:
+        raise TypeError('Input should be 1D array')
+    return betas_extrap, thetas_extrap
+
+
+def aero_coef(betas_extrap, thetas_extrap, method, coor_system, degree_list=default_degree_list):
     """
     betas: 1D-array
     thetas: 1D-array (same size as betas)
@@ -307,19 +420,9 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
     in "Local normal wind coordinates" (the same as the Lwbar system from L.D.Zhu when rotated by beta back to non-skew position) or in Ls.
     Regardless, in the process, Local Structural coordinates are used for correctness in symmetry transformations and in constraints.
     """
-    betas_extrap = copy.deepcopy(betas_extrap)
-    thetas_extrap = copy.deepcopy(thetas_extrap)
-    # Data error checks
-    if any(abs(thetas_extrap) > rad(90)):
-        raise ValueError('At least one theta is outside [-90,90] deg (in radians)')
-    if any(abs(betas_extrap) > rad(180)):
-        raise ValueError('At least one beta is outside [-180,180] deg (in radians)')
-    if len(betas_extrap.flatten()) != len(thetas_extrap.flatten()):
-        raise ValueError('Both arrays need to have same size')
-    if len(np.shape(betas_extrap)) != 1 or len(np.shape(thetas_extrap)) != 1:
-        raise TypeError('Input should be 1D array')
+    betas_extrap, thetas_extrap = aero_coef_input_check(betas_extrap, thetas_extrap)
 
-    size = len(betas_extrap)
+    size = betas_extrap.size
 
     # IF TABLE:
     if method[-5:] == '.xlsx':
@@ -328,53 +431,29 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
         else:  # COSINE RULE
             assert method[:9] == 'cos_rule_'
             # Get the table in Ls coordinates (must exist first!). Only then, if necessary, transform to Gw coordinates.
-            _, Cx_sign, Cy_sign, Cz_sign, Cxx_sign, Cyy_sign, Czz_sign = get_C_signs_and_change_betas_extrap(betas_extrap)  # Get coefficient signs.
-            zeros = np.zeros(size)
+            betas_extrap, C_signs = get_C_signs_and_change_betas_extrap(betas_extrap)  # Get coefficient signs.
             table_name = method[9:]
             table_name_Ls = table_name.replace('_Gw_', '_Ls_')
-            C_Ci_Ls_table_interp_beta0 = aero_coef_table_method(zeros, thetas_extrap, method=table_name_Ls, coor_system="Ls")
-            C_Ci_Ls_table_interp_beta0 = np.array([zeros,
-                                                   C_Ci_Ls_table_interp_beta0[1]*Cy_sign,
-                                                   C_Ci_Ls_table_interp_beta0[2]*Cz_sign,
-                                                   C_Ci_Ls_table_interp_beta0[3]*Cxx_sign,
-                                                   zeros,
-                                                   zeros])
-            C_Ci_Ls_cos_rule = C_Ci_Ls_table_interp_beta0 * np.cos(betas_extrap) ** 2
+            C_Ci_Ls_cos_rule = aero_coef_table_method(np.zeros(size), thetas_extrap, method=table_name_Ls, coor_system="Ls")
+            # Only Cy, Cz and Cxx are used. Cx, Cyy and Czz are set to 0
+            C_Ci_Ls_cos_rule[[0, 4, 5]] = 0.
+            C_Ci_Ls_cos_rule[1:4] *= C_signs[1:4]
+            C_Ci_Ls_cos_rule[1:4] *= np.cos(betas_extrap) ** 2
             if coor_system == 'Ls':
                 return C_Ci_Ls_cos_rule
             elif coor_system == 'Gw':
                 T_GwLs = np.transpose(T_LsGw_func(betas_extrap, thetas_extrap, dim='6x6'), axes=(0, 2, 1))
-                C_Ci_Gw_cos_rule = np.einsum('nij,jn->in', T_GwLs, C_Ci_Ls_cos_rule, optimize=True)
+                # Batched matrix-vector product, one 6x6 transformation per point (same as np.einsum('nij,jn->in', ...))
+                C_Ci_Gw_cos_rule = (T_GwLs @ C_Ci_Ls_cos_rule.T[:, :, None])[:, :, 0].T
                 return C_Ci_Gw_cos_rule
 
 
     # If NOT TABLE
-    # Importing input data
-    df = df_aero_coef_measurement_data(method)
-
-    betas_SOH = rad(df['beta[deg]'].to_numpy())
-    thetas_SOH = rad(df['theta[deg]'].to_numpy())
-    Cx_Ls = df['Cx_Ls'].to_numpy()
-    Cy_Ls = df['Cy_Ls'].to_numpy()
-    Cz_Ls = df['Cz_Ls'].to_numpy()
-    Cxx_Ls = df['Cxx_Ls'].to_numpy()
-    Cyy_Ls = df['Cyy_Ls'].to_numpy()
-    Czz_Ls = df['Czz_Ls'].to_numpy()
-
     # Get coefficient signs and then change all betas back to the 0-90 quadrant.
-    betas_extrap, Cx_sign, Cy_sign, Cz_sign, Cxx_sign, Cyy_sign, Czz_sign = get_C_signs_and_change_betas_extrap(betas_extrap)
+    betas_extrap, C_signs = get_C_signs_and_change_betas_extrap(betas_extrap)  # C_signs shape is (6, size)
 
-    # Input data and desired output coordinates (betas and thetas)
-    data_in_Cx_Ls = np.array([betas_SOH, thetas_SOH, Cx_Ls])
-    data_in_Cy_Ls = np.array([betas_SOH, thetas_SOH, Cy_Ls])
-    data_in_Cz_Ls = np.array([betas_SOH, thetas_SOH, Cz_Ls])
-    data_in_Cxx_Ls = np.array([betas_SOH, thetas_SOH, Cxx_Ls])
-    data_in_Cyy_Ls = np.array([betas_SOH, thetas_SOH, Cyy_Ls])
-    data_in_Czz_Ls = np.array([betas_SOH, thetas_SOH, Czz_Ls])
-
-    data_coor_out = np.array([betas_extrap.flatten(), thetas_extrap.flatten()])
-    data_bounds = np.array([[0, np.pi / 2], [-np.pi / 2, np.pi / 2]])  # [[beta bounds], [theta bounds]]
-    data_bounds_Cy = np.array([[0, np.pi / 2], [-rad(30), rad(30)]])  # [[beta bounds], [theta bounds]]
+    # Desired output coordinates (betas and thetas). The input data and the polynomial fits are cached, see aero_coef_poly_fit and aero_coef_evaluator
+    data_coor_out = np.array([betas_extrap.ravel(), thetas_extrap.ravel()])
 
     # Transforming the coefficients to Local normal wind "Lnw" coordinates, whose axes are defined as:
     # x-axis <=> along-normal-wind (i.e. a "cos-rule-drag"), aligned with the (U+u)*cos(beta) that lies in a 2D plane normal to the bridge girder.
@@ -384,79 +463,46 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
     if 'Lnw' in coor_system:
         print('WARNING: Avoid using coor_system=Lnw. This has not been carefully looked at')
         theta_yz = theta_yz_bar_func(betas_extrap, thetas_extrap)
-        T_LnwLs = T_LnwLs_func(betas=betas_extrap, theta_yz=theta_yz, dim='6x6')
+        T_LnwLs = T_LnwLs_func(beta=betas_extrap, theta_yz=theta_yz, dim='6x6')
 
     # 2D polynomial fitting. Note: wrong signs if outside [0,90]
     if '2D_fit_free' in method or method == 'hybrid':
-        Cx_Ls_2D_fit_free = cons_poly_fit(data_in_Cx_Ls, data_coor_out, data_bounds, degree=degree_list[method][0], ineq_constraint=False,
-                                          other_constraint=False, degree_type='max')[1] * Cx_sign
-        Cy_Ls_2D_fit_free = cons_poly_fit(data_in_Cy_Ls, data_coor_out, data_bounds, degree=degree_list[method][1], ineq_constraint=False,
-                                          other_constraint=False, degree_type='max')[1] * Cy_sign
-        Cz_Ls_2D_fit_free = cons_poly_fit(data_in_Cz_Ls, data_coor_out, data_bounds, degree=degree_list[method][2], ineq_constraint=False,
-                                          other_constraint=False, degree_type='max')[1] * Cz_sign
-        Cxx_Ls_2D_fit_free = cons_poly_fit(data_in_Cxx_Ls, data_coor_out, data_bounds, degree=degree_list[method][3], ineq_constraint=False,
-                                           other_constraint=False, degree_type='max')[1] * Cxx_sign
-        Cyy_Ls_2D_fit_free = cons_poly_fit(data_in_Cyy_Ls, data_coor_out, data_bounds, degree=degree_list[method][4], ineq_constraint=False,
-                                           other_constraint=False, degree_type='max')[1] * Cyy_sign
-        Czz_Ls_2D_fit_free = cons_poly_fit(data_in_Czz_Ls, data_coor_out, data_bounds, degree=degree_list[method][5], ineq_constraint=False,
-                                           other_constraint=False, degree_type='max')[1] * Czz_sign
-        C_Ci_Ls_2D_fit_free = np.array(
-            [Cx_Ls_2D_fit_free, Cy_Ls_2D_fit_free, Cz_Ls_2D_fit_free, Cxx_Ls_2D_fit_free, Cyy_Ls_2D_fit_free,
-             Czz_Ls_2D_fit_free])
+        C_Ci_Ls_2D_fit_free = aero_coef_evaluator(method, tuple(degree_list[method])).evaluate_1st_quadrant(data_coor_out)
+        C_Ci_Ls_2D_fit_free *= C_signs
         if 'Lnw' in coor_system:
-            C_Ci_Lnw_2D_fit_free = np.einsum('icd,di->ci', T_LnwLs, C_Ci_Ls_2D_fit_free, optimize=True)
+            C_Ci_Lnw_2D_fit_free = (T_LnwLs @ C_Ci_Ls_2D_fit_free.T[:, :, None])[:, :, 0].T
 
     # Cosine rule: Coefficients(beta,theta) = Coefficients(0,theta)*cos(beta)**2. See LDZhu PhD Thesis, Chapter 6.7. Note: wrong signs if outside [0,90]
     if method in ['cos_rule', 'hybrid', '2D']:
         if method == '2D':
-            theta_yz = theta_yz_bar_func(betas_extrap, thetas_extrap)
-            # First step: find the C(0,theta) values for all thetas (even if repeated), using the 2D fit on all SOH data_in.
-            data_coor_out_beta_0_theta_all = np.array([np.zeros(size), theta_yz.flatten()])
-            Cx_Ls_2D_fit_beta_0_theta_all = np.zeros(size)
-            # Cx_Ls_2D_fit_beta_0_theta_all = cons_poly_fit( data_in_Cx_Ls , data_coor_out_beta_0_theta_all, data_bounds, degree=2, ineq_constraint=False, other_constraint=False, degree_type='total')[1] * Cx_sign
-            Cy_Ls_2D_fit_beta_0_theta_all = \
-            cons_poly_fit(data_in_Cy_Ls[:,:5], data_coor_out_beta_0_theta_all, data_bounds, degree=degree_list['2D_fit_free'][1], ineq_constraint=False,
-                          other_constraint=False, degree_type='total')[1] * Cy_sign
-            Cz_Ls_2D_fit_beta_0_theta_all = \
-            cons_poly_fit(data_in_Cz_Ls[:,:5], data_coor_out_beta_0_theta_all, data_bounds, degree=degree_list['2D_fit_free'][2], ineq_constraint=False,
-                          other_constraint=False, degree_type='total')[1] * Cz_sign
-            Cxx_Ls_2D_fit_beta_0_theta_all = \
-            cons_poly_fit(data_in_Cxx_Ls[:,:5], data_coor_out_beta_0_theta_all, data_bounds, degree=degree_list['2D_fit_free'][3], ineq_constraint=False,
-                          other_constraint=False, degree_type='total')[1] * Cxx_sign
-            Cyy_Ls_2D_fit_beta_0_theta_all = np.zeros(size)
-            Czz_Ls_2D_fit_beta_0_theta_all = np.zeros(size)
-
-            factor = np.sin(thetas_extrap)**2 + np.cos(betas_extrap)**2 * np.cos(thetas_extrap)**2
-
+            # Each trigonometric function is computed only once, and reused in both the factor and theta_yz
+            sin_t = np.sin(thetas_extrap)
+            cos2_t = np.cos(thetas_extrap)
+            cos2_t *= cos2_t
+            # factor = sin(theta)**2 + cos(beta)**2 * cos(theta)**2, computed in-place
+            factor = np.cos(betas_extrap)
+            factor *= factor
+            factor *= cos2_t
+            factor += sin_t * sin_t
+            # The same as theta_yz_bar_func(betas_extrap, thetas_extrap), whose denominator is sqrt(factor)
+            theta_yz = np.arcsin(sin_t / np.sqrt(factor))
+            thetas_beta_0 = theta_yz
         elif method == 'cos_rule':
-            # First step: find the C(0,theta) values for all thetas (even if repeated), using the 2D fit on all SOH data_in.
-            data_coor_out_beta_0_theta_all = np.array([np.zeros(size), thetas_extrap.flatten()])
-            Cx_Ls_2D_fit_beta_0_theta_all = np.zeros(size)
-            # Cx_Ls_2D_fit_beta_0_theta_all = cons_poly_fit( data_in_Cx_Ls , data_coor_out_beta_0_theta_all, data_bounds, degree=2, ineq_constraint=False, other_constraint=False, degree_type='total')[1] * Cx_sign
-            Cy_Ls_2D_fit_beta_0_theta_all = \
-            cons_poly_fit(data_in_Cy_Ls[:,:5], data_coor_out_beta_0_theta_all, data_bounds, degree=degree_list['2D_fit_free'][1], ineq_constraint=False,
-                          other_constraint=False, degree_type='total')[1] * Cy_sign
-            Cz_Ls_2D_fit_beta_0_theta_all = \
-            cons_poly_fit(data_in_Cz_Ls[:,:5], data_coor_out_beta_0_theta_all, data_bounds, degree=degree_list['2D_fit_free'][2], ineq_constraint=False,
-                          other_constraint=False, degree_type='total')[1] * Cz_sign
-            Cxx_Ls_2D_fit_beta_0_theta_all = \
-            cons_poly_fit(data_in_Cxx_Ls[:,:5], data_coor_out_beta_0_theta_all, data_bounds, degree=degree_list['2D_fit_free'][3], ineq_constraint=False,
-                          other_constraint=False, degree_type='total')[1] * Cxx_sign
-            Cyy_Ls_2D_fit_beta_0_theta_all = np.zeros(size)
-            Czz_Ls_2D_fit_beta_0_theta_all = np.zeros(size)
-
+            thetas_beta_0 = thetas_extrap
             factor = np.cos(betas_extrap) ** 2
 
-        Cx_Ls_cos = Cx_Ls_2D_fit_beta_0_theta_all * factor
-        Cy_Ls_cos = Cy_Ls_2D_fit_beta_0_theta_all * factor
-        Cz_Ls_cos = Cz_Ls_2D_fit_beta_0_theta_all * factor
-        Cxx_Ls_cos = Cxx_Ls_2D_fit_beta_0_theta_all * factor
-        Cyy_Ls_cos = Cyy_Ls_2D_fit_beta_0_theta_all * factor
-        Czz_Ls_cos = Czz_Ls_2D_fit_beta_0_theta_all * factor
-        C_Ci_Ls_cos = np.array([Cx_Ls_cos, Cy_Ls_cos, Cz_Ls_cos, Cxx_Ls_cos, Cyy_Ls_cos, Czz_Ls_cos])
+        # First step: find the C(0,theta) values for all thetas (even if repeated), using the 2D fit on the beta=0 SOH data_in.
+        # Only Cy, Cz and Cxx are fitted. Cx, Cyy and Czz are 0 at beta=0 and stay 0.
+        data_coor_out_beta_0_theta_all = np.array([np.zeros(size), thetas_beta_0])
+        C_Ci_Ls_cos = np.zeros((6, size))
+        for C_idx in [1, 2, 3]:
+            C_Ci_Ls_cos[C_idx] = aero_coef_poly_fit(method, C_idx, data_coor_out_beta_0_theta_all, degree=degree_list['2D_fit_free'][C_idx],
+                                                    ineq_constraint=False, other_constraint=False, degree_type='total', beta_0_strip=True)
+        C_Ci_Ls_cos[1:4] *= C_signs[1:4]
+        C_Ci_Ls_cos[1:4] *= factor
 
         if 'Lnw' in coor_system:
-            C_Ci_Lnw_cos = np.einsum('icd,di->ci', T_LnwLs, C_Ci_Ls_cos, optimize=True)
+            C_Ci_Lnw_cos = (T_LnwLs @ C_Ci_Ls_cos.T[:, :, None])[:, :, 0].T
         # Note: The cos^2 rule, from L.D.Zhu eq. (6-10), is to be performed on structural xyz coordinates.
 
     # Hybrid Model: If inside SOH domain = 2D fit, if outside: Cosine. Smooth function between them. Different for Ca.
@@ -469,45 +515,12 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
         pass
 
     if '2D_fit_cons' in method:
-        # Ls coordinates.
-        # The constraints are reasoned for a 0-90 deg interval, but applicable to a -180 to 180 deg interval when the symmetry signs (defined above) are also used.
-        # Cx
-        ineq_constraint_Cx = False  # False or 'positivity' or 'negativity'
-        other_constraint_Cx = ['F_is_0_at_x0_start', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_end']
-        # Cy
-        ineq_constraint_Cy = False  # False or 'positivity' or 'negativity'
-        other_constraint_Cy = ['F_is_0_at_x0_end', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_start', 'dF/dx0_is_0_at_x0_end_at_x1_middle']  # , 'F_is_0p13_at_x0_start_at_x1_middle']
-        # Cz
-        ineq_constraint_Cz = False  # False or 'positivity' or 'negativity'. we could have: dF/dx1_is_positive_at_x0_end', but difficult to implement with little gain.
-        other_constraint_Cz = ['F_is_0_at_x0_end_at_x1_middle', 'dF/dx0_is_0_at_x0_start', 'dF/dx0_is_0_at_x0_end', 'F_is_CFD_at_x0_end_at_x1_-10', 'F_is_CFD_at_x0_end_at_x1_10']  #, 'F_is_-2_at_x1_start', 'F_is_2_at_x1_end']  # , 'dF/dx1_is_16p4_at_x0_start_at_x1_middle', 'F_is_-0p19_at_x0_start_at_x1_middle'], # can eventually remove derivative constraint
-        # Cxx
-        ineq_constraint_Cxx = False  # False or 'positivity' or 'negativity'
-        other_constraint_Cxx = ['F_is_0_at_x0_end', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_start', 'dF/dx0_is_0_at_x0_end_at_x1_middle']   # 'dF/dx0_is_0_at_x0_start'
-        # Cyy
-        ineq_constraint_Cyy = False  # False or 'positivity' or 'negativity'
-        other_constraint_Cyy = ['F_is_0_at_x0_start', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end', 'dF/dx0_is_0_at_x0_end']
-        # Czz
-        ineq_constraint_Czz = False  # False or 'positivity' or 'negativity'
-        other_constraint_Czz = ['F_is_0_at_x0_start', 'F_is_0_at_x0_end', 'F_is_0_at_x1_start', 'F_is_0_at_x1_end']
-        Cx_Ls_2D_fit_cons = \
-        cons_poly_fit(data_in_Cx_Ls, data_coor_out, data_bounds, degree_list[method][0], ineq_constraint_Cx, other_constraint_Cx,
-                      degree_type='max')[1] * Cx_sign
-        Cy_Ls_2D_fit_cons = \
-        cons_poly_fit(data_in_Cy_Ls, data_coor_out, data_bounds, degree_list[method][1], ineq_constraint_Cy, other_constraint_Cy,
-                      degree_type='max')[1] * Cy_sign  #,, minimize_method='trust-constr', init_guess=[3.71264795e-22, -8.86505000e+00, 4.57056472e+01, -7.39911989e+01, 3.71506016e+01, -6.12248467e-22, -8.75830974e+00,  5.74817737e+01, -1.10425715e+02, 6.17022514e+01, -1.09522498e-21, -2.46382690e+01, 7.14658962e+01, -4.41460857e+01, -2.68154157e+00,  0.00000000e+00, 4.21168758e+01, -1.42475723e+02,  1.30059436e+02, -2.97005883e+01, 0.00000000e+00,  1.44752923e-01, -3.21775938e+01,  9.85035640e+01, -6.64707231e+01])[1] * Cy_sign  # minimize_method='trust-constr'
-        Cz_Ls_2D_fit_cons = \
-        cons_poly_fit(data_in_Cz_Ls, data_coor_out, data_bounds, degree_list[method][2], ineq_constraint_Cz, other_constraint_Cz,
-                      degree_type='max')[1] * Cz_sign
-        Cxx_Ls_2D_fit_cons = \
-        cons_poly_fit(data_in_Cxx_Ls, data_coor_out, data_bounds, degree_list[method][3], ineq_constraint_Cxx, other_constraint_Cxx,
-                      degree_type='max')[1] * Cxx_sign
-        Cyy_Ls_2D_fit_cons = \
-        cons_poly_fit(data_in_Cyy_Ls, data_coor_out, data_bounds, degree_list[method][4], ineq_constraint_Cyy, other_constraint_Cyy,
-                      degree_type='max')[1] * Cyy_sign
-        Czz_Ls_2D_fit_cons = \
-        cons_poly_fit(data_in_Czz_Ls, data_coor_out, data_bounds, degree_list[method][5], ineq_constraint_Czz, other_constraint_Czz,
-                      degree_type='max')[1] * Czz_sign
-        C_Ci_Ls_2D_fit_cons = np.array([Cx_Ls_2D_fit_cons, Cy_Ls_2D_fit_cons, Cz_Ls_2D_fit_cons, Cxx_Ls_2D_fit_cons, Cyy_Ls_2D_fit_cons,Czz_Ls_2D_fit_cons])
+        # Ls coordinates. See fit_cons_ineq_constraints and fit_cons_other_constraints
+        # Cy alternative: minimize_method='trust-constr', init_guess=[3.71264795e-22, -8.86505000e+00, 4.57056472e+01, -7.39911989e+01, 3.71506016e+01, -6.12248467e-22, -8.75830974e+00,  5.74817737e+01, -1.10425715e+02, 6.17022514e+01, -1.09522498e-21, -2.46382690e+01, 7.14658962e+01, -4.41460857e+01, -2.68154157e+00,  0.00000000e+00, 4.21168758e+01, -1.42475723e+02,  1.30059436e+02, -2.97005883e+01, 0.00000000e+00,  1.44752923e-01, -3.21775938e+01,  9.85035640e+01, -6.64707231e+01]
+        C_Ci_Ls_2D_fit_cons = aero_coef_evaluator(method, tuple(degree_list[method])).evaluate_1st_quadrant(data_coor_out)
+        C_Ci_Ls_2D_fit_cons *= C_signs
+        if 'Lnw' in coor_system:
+            C_Ci_Lnw_2D_fit_cons = (T_LnwLs @ C_Ci_Ls_2D_fit_cons.T[:, :, None])[:, :, 0].T
 
     # if method == '2D_fit_cons_2':
     #     # Ls coordinates.
@@ -561,13 +574,8 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
         C_Ci_Gw_benchmark = np.zeros((6, size))
         C_Ci_Gw_benchmark[0,:] = 0.0745517584974706
         factor = np.cos(betas_extrap) ** 2
-        C_Ci_Ls_benchmark = factor * np.einsum('icd,di->ci', T_LsGw, C_Ci_Gw_benchmark, optimize=True)
-        C_Ci_Ls_benchmark = np.array([C_Ci_Ls_benchmark[0] * Cx_sign,
-                                      C_Ci_Ls_benchmark[1] * Cy_sign,
-                                      C_Ci_Ls_benchmark[2] * Cz_sign,
-                                      C_Ci_Ls_benchmark[3] * Cxx_sign,
-                                      C_Ci_Ls_benchmark[4] * Cyy_sign,
-                                      C_Ci_Ls_benchmark[5] * Czz_sign])
+        C_Ci_Ls_benchmark = factor * (T_LsGw @ C_Ci_Gw_benchmark.T[:, :, None])[:, :, 0].T
+        C_Ci_Ls_benchmark *= C_signs
         return C_Ci_Ls_benchmark  # shape is (6, g_node_num)
     
     if method == 'benchmark2':
@@ -575,29 +583,16 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
         C_Ci_Gw_benchmark = np.zeros((6, size))
         C_Ci_Gw_benchmark[2,:] = -0.14749
         factor = np.cos(betas_extrap) ** 2
-        C_Ci_Ls_benchmark = factor * np.einsum('icd,di->ci', T_LsGw, C_Ci_Gw_benchmark, optimize=True)
-        C_Ci_Ls_benchmark = np.array([C_Ci_Ls_benchmark[0] * Cx_sign,
-                                      C_Ci_Ls_benchmark[1] * Cy_sign,
-                                      C_Ci_Ls_benchmark[2] * Cz_sign,
-                                      C_Ci_Ls_benchmark[3] * Cxx_sign,
-                                      C_Ci_Ls_benchmark[4] * Cyy_sign,
-                                      C_Ci_Ls_benchmark[5] * Czz_sign])
+        C_Ci_Ls_benchmark = factor * (T_LsGw @ C_Ci_Gw_benchmark.T[:, :, None])[:, :, 0].T
+        C_Ci_Ls_benchmark *= C_signs
         return C_Ci_Ls_benchmark  # shape is (6, g_node_num)
     
     if method == 'benchmark3':
         C_Ci_Ls_benchmark = np.zeros((6, size))
         C_Ci_Ls_benchmark[1,:] = 0.0745517584974706
-        C_Ci_Ls_benchmark = np.array([C_Ci_Ls_benchmark[0] * Cx_sign,
-                                      C_Ci_Ls_benchmark[1] * Cy_sign,
-                                      C_Ci_Ls_benchmark[2] * Cz_sign,
-                                      C_Ci_Ls_benchmark[3] * Cxx_sign,
-                                      C_Ci_Ls_benchmark[4] * Cyy_sign,
-                                      C_Ci_Ls_benchmark[5] * Czz_sign])
+        C_Ci_Ls_benchmark *= C_signs
         return C_Ci_Ls_benchmark  # shape is (6, g_node_num)
-    
 
-    if 'Lnw' in coor_system:
-        C_Ci_Lnw_2D_fit_cons = np.einsum('icd,di->ci', T_LnwLs, C_Ci_Ls_2D_fit_cons, optimize=True)
 
     if coor_system == 'Ls':
         if '2D_fit_free' in method:
@@ -632,9 +627,14 @@ def aero_coef(betas_extrap, thetas_extrap, method, coor_system,
             return None
 
 
-def aero_coef_derivatives(betas, thetas, method, coor_system):
-    betas = copy.deepcopy(betas)
-    thetas = copy.deepcopy(thetas)
+# Quadrant boundaries of beta, where aero_coef_derivatives corrects the betas upwards or downwards (see below)
+betas_corrected_upwards_near = np.array([-rad_180, -rad_90, 0.])
+betas_corrected_downwards_near = np.array([rad_90, rad_180])
+
+
+def aero_coef_derivatives(betas, thetas, method, coor_system, degree_list=default_degree_list):
+    betas = np.asarray(betas, dtype=float)
+    thetas = np.asarray(thetas, dtype=float)
     # Attention: The Lnw will produce wrong errors since Lnw adapts to all Ci(theta), Ci(theta_prev) and Ci(theta_next) and then the gradient is wrong, and very different for beta -180 and 0 deg,
     # since Lnw is only physical in the [0,90] beta-interval.
     if coor_system == 'Lnw': print('WARNING: coor_system should be "Ls" otherwise the dtheta derivatives will be WRONG!')
@@ -644,21 +644,13 @@ def aero_coef_derivatives(betas, thetas, method, coor_system):
     # Attention: if some beta are super close to the boundaries -180,-90,0,90,180 since aero_coef function mirrors f.ex: Ci_before = -0.1 back to 0.1 and then the derivative is wrong and huge (an example gave 10**5 bigger value)! Solution: decrease delta_angle.
     # Correting the error when a beta is exactly at the boundary, by deliberatelly changing problematic betas to very close values.
     angle_correction = delta_angle * 2.1  # rad.
-    for i, beta in enumerate(betas):
-        if abs(beta - rad(-180)) < delta_angle:
-            betas[i] += angle_correction
-        if abs(beta - rad(-90)) < delta_angle:
-            betas[i] += angle_correction
-        if abs(beta - rad(0)) < delta_angle:
-            betas[i] += angle_correction
-        if abs(beta - rad(90)) < delta_angle:
-            betas[i] -= angle_correction
-        if abs(beta - rad(180)) < delta_angle:
-            betas[i] -= angle_correction
+    mask_plus = np.any(np.isclose(betas[:, None], betas_corrected_upwards_near, rtol=0, atol=delta_angle), axis=1)
+    mask_minus = np.any(np.isclose(betas[:, None], betas_corrected_downwards_near, rtol=0, atol=delta_angle), axis=1)
+    betas = np.where(mask_plus, betas + angle_correction, np.where(mask_minus, betas - angle_correction, betas))
 
     # Check if previous correction worked:
-    if any(abs(rad(180) - abs(betas)) <= delta_angle) or any(abs(rad(90) - abs(betas)) <= delta_angle) or any(
-            abs(rad(0) - abs(betas)) <= delta_angle):
+    abs_betas = np.abs(betas)
+    if np.any((np.abs(rad_180 - abs_betas) <= delta_angle) | (np.abs(rad_90 - abs_betas) <= delta_angle) | (abs_betas <= delta_angle)):
         print("WARNING !!! : at least one aero coef derivative could be wrong.")
 
     # Values "previous" and "next" meaning negative and positive infinitesimal variation of the respective angles.
@@ -667,60 +659,41 @@ def aero_coef_derivatives(betas, thetas, method, coor_system):
     theta_prev = thetas - delta_angle
     theta_next = thetas + delta_angle
 
-    # The centered value of the coefficients
-    Cx, Cy, Cz, Cxx, Cyy, Czz = aero_coef(copy.deepcopy(betas), copy.deepcopy(thetas), method=method, coor_system=coor_system)
-
-    # The immediately before and after values of the coefficients
-    Cx_beta_prev, Cy_beta_prev, Cz_beta_prev, Cxx_beta_prev, Cyy_beta_prev, Czz_beta_prev = aero_coef(copy.deepcopy(beta_prev), copy.deepcopy(thetas), method=method, coor_system=coor_system)
-    Cx_beta_next, Cy_beta_next, Cz_beta_next, Cxx_beta_next, Cyy_beta_next, Czz_beta_next = aero_coef(copy.deepcopy(beta_next), copy.deepcopy(thetas), method=method, coor_system=coor_system)
-    Cx_theta_prev, Cy_theta_prev, Cz_theta_prev, Cxx_theta_prev, Cyy_theta_prev, Czz_theta_prev = aero_coef(copy.deepcopy(betas), copy.deepcopy(theta_prev), method=method, coor_system=coor_system)
-    Cx_theta_next, Cy_theta_next, Cz_theta_next, Cxx_theta_next, Cyy_theta_next, Czz_theta_next = aero_coef(copy.deepcopy(betas), copy.deepcopy(theta_next), method=method, coor_system=coor_system)
+    # All 4 stencil points (beta_prev, beta_next, theta_prev, theta_next) are evaluated in one single aero_coef call. (The centered value is not needed)
+    size = betas.size
+    betas_all = np.concatenate([beta_prev, beta_next, betas, betas])
+    thetas_all = np.concatenate([thetas, thetas, theta_prev, theta_next])
+    C_Ci_prev_next = aero_coef(betas_all, thetas_all, method=method, coor_system=coor_system, degree_list=degree_list).reshape((6, 4, size))
 
-    # Calculating the derivatives = delta(Coef)/delta(angle)
-    Cx_dbeta = np.gradient( np.array([ Cx_beta_prev,  Cx,  Cx_beta_next]), axis=0)[1] / delta_angle  # Confirmed. For cos_rule method, compared with d(cos(x)**2) = -sin(2x)
-    Cy_dbeta = np.gradient( np.array([ Cy_beta_prev,  Cy,  Cy_beta_next]), axis=0)[1] / delta_angle
-    Cz_dbeta = np.gradient( np.array([ Cz_beta_prev,  Cz,  Cz_beta_next]), axis=0)[1] / delta_angle
-    Cxx_dbeta = np.gradient(np.array([Cxx_beta_prev, Cxx, Cxx_beta_next]), axis=0)[1] / delta_angle  # Confirmed. For cos_rule method, compared with d(cos(x)**2) = -sin(2x)
-    Cyy_dbeta = np.gradient(np.array([Cyy_beta_prev, Cyy, Cyy_beta_next]), axis=0)[1] / delta_angle
-    Czz_dbeta = np.gradient(np.array([Czz_beta_prev, Czz, Czz_beta_next]), axis=0)[1] / delta_angle
+    # Calculating the derivatives = delta(Coef)/delta(angle), with central differences: (C_next - C_prev) / (2 * delta_angle)
+    # Confirmed. For cos_rule method, compared with d(cos(x)**2) = -sin(2x)
+    inv_2_delta = 0.5 / delta_angle
+    C_Ci_dbeta = (C_Ci_prev_next[:, 1] - C_Ci_prev_next[:, 0]) * inv_2_delta
+    C_Ci_dtheta = (C_Ci_prev_next[:, 3] - C_Ci_prev_next[:, 2]) * inv_2_delta
 
-    Cx_dtheta = np.gradient( np.array([ Cx_theta_prev,  Cx,  Cx_theta_next]), axis=0)[1] / delta_angle  # Confirmed. For cos_rule method, compared with d(cos(x)**2) = -sin(2x)
-    Cy_dtheta = np.gradient( np.array([ Cy_theta_prev,  Cy,  Cy_theta_next]), axis=0)[1] / delta_angle
-    Cz_dtheta = np.gradient( np.array([ Cz_theta_prev,  Cz,  Cz_theta_next]), axis=0)[1] / delta_angle
-    Cxx_dtheta = np.gradient(np.array([Cxx_theta_prev, Cxx, Cxx_theta_next]), axis=0)[1] / delta_angle  # Confirmed. For cos_rule method, compared with d(cos(x)**2) = -sin(2x)
-    Cyy_dtheta = np.gradient(np.array([Cyy_theta_prev, Cyy, Cyy_theta_next]), axis=0)[1] / delta_angle
-    Czz_dtheta = np.gradient(np.array([Czz_theta_prev, Czz, Czz_theta_next]), axis=0)[1] / delta_angle
-
-    return np.array([[Cx_dbeta, Cy_dbeta, Cz_dbeta, Cxx_dbeta, Cyy_dbeta, Czz_dbeta],
-                     [Cx_dtheta, Cy_dtheta, Cz_dtheta, Cxx_dtheta, Cyy_dtheta, Czz_dtheta]])
+    return np.array([C_Ci_dbeta, C_Ci_dtheta])
 
 
 def from_SOH_to_Zhu_coef_normalization(Cd, Cl, Cm, Ca):
     """
     All in bridge local reference frame "Ls" (not wind reference frame "Lw")
     Converting the experimental coefficients normalized according to SOH, to Zhu's normalization.
-    This function could have only 4 lines, but the following is for understanding (de-normalizing and normalizing again)
+    De-normalizing the SOH coefficients into forces and normalizing them again according to Zhu, the dynamic pressure
+    1/2 * rho * U_model ** 2 and the model length L_model cancel out, and only the ratios of the reference lengths remain:
+    SOH report, eq.(C.1)-(C.3): Fd = 1/2*rho*U**2*L*h*Cd, Fl = 1/2*rho*U**2*L*b*Cl, Fm = 1/2*rho*U**2*L*b**2*Cm, Fa = 1/2*rho*U**2*L*P*Ca
+    L.D.Zhu (see You-Lin Xu book, eq. (10.13)): Cd_Zhu = Fd/L/(1/2*rho*U**2*b), Cl_Zhu = Fl/L/(1/2*rho*U**2*b), Cm_Zhu = Fm/L/(1/2*rho*U**2*b**2), Ca_Zhu = Fa/L/(1/2*rho*U**2*b)
+    Cd, Cl, Cm, Ca can be scalars or numpy arrays (e.g. all the betas and thetas of a table at once), since the conversion is
+    elementwise. Prefer one call with arrays over one call per point.
     """
-    rho = 1.25  # [kg/m3]. air density. Not important since it cancels itself.
-    U_model = 10  # [m/s]. model wind speed. Not important since it cancels itself.
-
     # SOH model in the wind tunnel.
     h_model = 0.043  # [m]. model height
     b_model = 0.386  # [m]. model width
-    L_model = 2.4  # [m]. model length
     P_model = 62.4 / 80  # [m]. model cross-section perimeter (real scale perimeter divided by scale factor)
 
-    # From SOH's coefficients, to Aerodynamic forces in the model. See SOH report, eq.(C.1)-(C.3)
-    Fd_model = 1 / 2 * rho * U_model ** 2 * L_model * h_model * Cd  # [N]
-    Fl_model = 1 / 2 * rho * U_model ** 2 * L_model * b_model * Cl  # [N]
-    Fm_model = 1 / 2 * rho * U_model ** 2 * L_model * b_model ** 2 * Cm  # [Nm]
-    Fa_model = 1 / 2 * rho * U_model ** 2 * L_model * P_model * Ca  # [N]
-
     # Normalizing according to L.D.Zhu. Note that these are still in bridge ref. frame, not in the wind ref. frame.
-    # See You-Lin Xu book, eq. (10.13).
-    Cd_Zhu = Fd_model / L_model / (1 / 2 * rho * U_model ** 2 * b_model)  # [-]
-    Cl_Zhu = Fl_model / L_model / (1 / 2 * rho * U_model ** 2 * b_model)  # [-]
-    Cm_Zhu = Fm_model / L_model / (1 / 2 * rho * U_model ** 2 * b_model ** 2)  # [-]
-    Ca_Zhu = Fa_model / L_model / (1 / 2 * rho * U_model ** 2 * b_model)  # [-]
+    Cd_Zhu = Cd * (h_model / b_model)  # [-]
+    Cl_Zhu = Cl  # [-]
+    Cm_Zhu = Cm  # [-]
+    Ca_Zhu = Ca * (P_model / b_model)  # [-]
 
     return Cd_Zhu, Cl_Zhu, Cm_Zhu, Ca_Zhu
@@ -20,6 +20,36 @@ def intertools_product(*args, repeat=1):
     for prod in result:
         yield tuple(prod)
 
+def poly_coef_str_list(n_ind_var, degree):
+    """
+    Naming each coefficient, according to the respective variables and their exponents. Generic monomial: 'Cijk... * x1**i  * x2**j * x3**k...'
+    e.g. with 2 independent variables and degree 2: ['00', '01', '02', '10', '11', '12', '20', '21', '22']
+    """
+    # The total number of coefficients in a complete multivariate polynomial is obtained as:
+    n_coef = np.prod(([degree + 1] * n_ind_var))
+    coef_str_list = []
+    for c in range(n_coef):
+        unpadded = np.base_repr(c, base=degree + 1, padding=0)
+        padding_length = n_ind_var - len(unpadded)  # padding parameter in np.base_repr doesnt work well for '0'
+        coef_str_list.append('0' * padding_length + unpadded)
+    return coef_str_list
+
+
+def poly_A_rows(D, degree):
+    """
+    :param D: Independent data point or points, e.g. data_in[:-1,0]. Shape (n_ind_var) or (n_ind_var, n_data)
+    :param degree: Polynomial (maximum) degree
+    :return: One row of the A matrix (or several rows if multiple data input and output)
+    """
+    poly_terms = []  # list to fill with the polynomial terms
+    for c_str in poly_coef_str_list(D.shape[0], degree):
+        term = []
+        for n, i in enumerate(c_str):
+            term.append(D[n, :] ** int(i))
+        poly_terms.append(np.prod(np.array(term), axis=0))
+    return np.array(poly_terms).T
+
+
 def cons_poly_fit(data_in, data_ind_out, data_ind_bounds, degree, ineq_constraint, other_constraint, degree_type, minimize_method='trust-constr', init_guess='zeros'):
     """
     (Constrained) Polynomial fitting of the data_in given, evaluated at the data_ind_out, giving data_dep_out. Constraints can be included.
@@ -56,8 +86,20 @@ def cons_poly_fit(data_in, data_ind_out, data_ind_bounds, degree, ineq_constrain
     - x is the vector with the polynomial coefficients, e.g. [C00, C01, C02, C10, ... ];
     - A is the necessary vector or matrix to make Ax=B happen. e.g. [[1, x2, x2**2, x1, x1*x2, x1*x2**2,..., x1**2*x2**2], [same, but new data point],...];
     - B is the vector with the dependent data_in to be fitted e.g. [data_in[-1,0], data_in[-1,1], data_in[-1,2], data_in[-1,3]...]
+
+    The fit (slow) and the evaluation (fast) are done by cons_poly_fit_coef and cons_poly_eval, which can also be used separately,
+    e.g. to fit only once and then evaluate the same polynomial at many different data_ind_out.
     """
+    poly_coeff = cons_poly_fit_coef(data_in, data_ind_bounds, degree, ineq_constraint, other_constraint, degree_type, minimize_method=minimize_method, init_guess=init_guess)
+    data_dep_out = cons_poly_eval(poly_coeff, data_ind_out, data_ind_bounds, degree)
+    return poly_coeff, data_dep_out
 
+
+def cons_poly_fit_coef(data_in, data_ind_bounds, degree, ineq_constraint, other_constraint, degree_type, minimize_method='trust-constr', init_guess='zeros'):
+    """
+    (Constrained) Polynomial fitting of the data_in given. See cons_poly_fit for the description of the parameters.
+    :return: polynomial coefficients, to be used in cons_poly_eval
+    """
     data_ind = data_in[:-1, :]  # independent variables of the data_in. e.g. coordinates: x0, x1, x2,...
     data_dep = data_in[-1, :]  # dependent variable of the data_in. e.g. data itself: y(x0,x1,x2,...)
     n_ind_var = data_ind.shape[0]  # number of independent variables (both in the input and output)
@@ -68,40 +110,16 @@ def cons_poly_fit(data_in, data_ind_out, data_ind_bounds, degree, ineq_constrain
     # Re-scaling all the independent variables from the intervals [data lower bound, data upper bound] to [0,1]
     # Independent data needs to be re-scaled to the [0,1] interval, for this preposition on constraints to work (see https://hal.inria.fr/hal-01073514v)
     data_ind_01 = np.array([(data_ind[n,:] - data_ind_bounds[n, 0]) / (data_ind_bounds[n, -1] - data_ind_bounds[n, 0]) for n in range(n_ind_var)])
-    data_ind_out_01 = np.array([(data_ind_out[n, :] - data_ind_bounds[n, 0]) / (data_ind_bounds[n, -1] - data_ind_bounds[n, 0]) for n in range(n_ind_var)])
 
-    # The total number of coefficients in a complete multivariate polynomial is obtained as:
+    # The total number of coefficients in a complete multivariate polynomial, and their names:
     n_coef = np.prod(([degree + 1] * n_ind_var))
+    coef_str_list = poly_coef_str_list(n_ind_var, degree)
 
-    # Naming each coefficient, according to the respective variables and their exponents. Generic monomial: 'Cijk... * x1**i  * x2**j * x3**k...'
-    coef_str_list = []
-    for c in range(n_coef):
-        unpadded = np.base_repr(c, base=degree + 1, padding=0)
-        padding_length = n_ind_var - len(unpadded)  # padding parameter in np.base_repr doesnt work well for '0'
-        coef_str_list.append('0' * padding_length + unpadded)
-
-    def A_rows(D):
-        """
-        :param D: Independent data point or points, e.g. data_in[:-1,0]. Shape (n_ind_var) or (n_ind_var, n_data)
-        :return: One row of the A matrix (or several rows if multiple data input and output)
-        """
-        poly_terms = []  # list to fill with the polynomial terms
-        poly_terms_str = []  # string version of poly_terms, necessary for defining the constraints
-        for c in range(n_coef):
-            term = []
-            term_str = []
-            for n, i in enumerate(coef_str_list[c]):
-                term.append(D[n, :] ** int(i))
-                term_str.append('x'+str(n)+'^'+str(i)+' ')
-            poly_terms.append(np.product(np.array(term), axis=0))
-            poly_terms_str.append(term_str)
-        return np.array(poly_terms).T
-
-    A = A_rows(data_ind_01)
+    A = poly_A_rows(data_ind_01, degree)
 
     # 'x' below refers to the polynomial fitting coefficients. e.g.: C00, C01, C10... etc
     def func_to_minimize_fitting(x):  # function to be minimized, which is the least squares method
-        return np.sum((np.dot(A_rows(data_ind_01), x) - data_dep) ** 2)
+        return np.sum((np.dot(A, x) - data_dep) ** 2)
 
     def func_to_minimize_fitting_jacobian(x):  # Jacobian of function to be minimized, which is the least squares method
         # # Slower version, easier to understand:
@@ -130,8 +148,13 @@ def cons_poly_fit(data_in, data_ind_out, data_ind_bounds, degree, ineq_constrain
     #     poly_coeff = res.x
     #     # print('Minimized function value, 2D-fit-free:')
     #     # print(res.fun)
-    #     data_ind_out = np.einsum('ic,c->i', A_rows(data_ind_out_01), poly_coeff)
+    #     data_ind_out = np.einsum('ic,c->i', poly_A_rows(data_ind_out_01, degree), poly_coeff)
     #     return poly_coeff, data_ind_out
+    # Note: without constraints, an exact least squares solution (e.g. scipy.linalg.lstsq(A, data_dep), which could also solve
+    # all coefficients at once with a multi-column data_dep) would be much faster, but is NOT equivalent. A is very ill-conditioned
+    # for degree >= 3 (cond(A) ~ 1e9-1e12 with the SOH data), and the exact solution has a slightly smaller residual at the data
+    # points but explodes outside them (e.g. '2D_fit_free' Czz reaching 1e4 at beta = 90 deg). The minimize() solution, starting from
+    # C_guess = zeros, acts as an implicit regularization and is the one to keep. Anyway, aero_coef caches the fitted coefficients.
 
     # Expressing the polynomial with Symbolic mathematics (Sympy).
     coefs = symbols(['C' + c for c in coef_str_list], real=True)
@@ -385,10 +408,62 @@ def cons_poly_fit(data_in, data_ind_out, data_ind_bounds, degree, ineq_constrain
     poly_coeff = res.x
     # print('Minimized function value, 2D-fit-cons:')
     # print(res.fun)
-
-    # Finally, the dependent data output. (Note: It was obtained from a data_ind_out scaled to [0,1], but when used with the original data_ind interval, gives expected results)
-    data_dep_out = np.einsum('ic,c->i', A_rows(data_ind_out_01), poly_coeff)
     # print('Degree: '+str(degree))
     # print(poly_coeff)
-    return poly_coeff, data_dep_out
+    return poly_coeff
+
+
+def cons_poly_eval(poly_coeff, data_ind_out, data_ind_bounds, degree):
+    """
+    Evaluates the polynomial with the poly_coeff obtained from cons_poly_fit_coef, at the data_ind_out, giving data_dep_out.
+    :param data_ind_out: Independent data (coordinates) output. Shape (n_ind_var, n_out_data)
+    :param data_ind_bounds: The same data_ind_bounds used in the fit, shape (n_ind_var,2)
+    :param degree: The same degree used in the fit
+    :return: data_dep_out. Shape (n_out_data)
+    """
+    n_ind_var = data_ind_out.shape[0]
+    data_ind_out_01 = np.array([(data_ind_out[n, :] - data_ind_bounds[n, 0]) / (data_ind_bounds[n, -1] - data_ind_bounds[n, 0]) for n in range(n_ind_var)])
+    # (Note: It was obtained from a data_ind_out scaled to [0,1], but when used with the original data_ind interval, gives expected results)
+    return np.einsum('ic,c->i', poly_A_rows(data_ind_out_01, degree), poly_coeff)
+
+
+
+def poly_coeff_to_degree(poly_coeff, n_ind_var, degree, new_degree):
+    """
+    Re-writes the poly_coeff of a polynomial with (maximum) degree, as the (zero-padded) coefficients of a polynomial with a higher new_degree.
+    """
+    assert new_degree >= degree
+    new_poly_coeff = np.zeros((new_degree + 1) ** n_ind_var)
+    new_idxs = [int(c_str, base=new_degree + 1) for c_str in poly_coef_str_list(n_ind_var, degree)]  # e.g. 'C12' is at index 1*(new_degree+1)+2
+    new_poly_coeff[new_idxs] = poly_coeff
+    return new_poly_coeff
+
 
+def poly_coeff_matrix(poly_coeff_list, degree_list, n_ind_var):
+    """
+    Stacks the poly_coeff of several polynomials as the columns of one matrix, all padded to the highest degree (see poly_coeff_to_degree).
+    :return: poly_coeff_matrix, shape (n_coef, n_polynomials), and the highest degree
+    """
+    max_degree = max(degree_list)
+    B = np.array([poly_coeff_to_degree(c, n_ind_var, d, max_degree) for c, d in zip(poly_coeff_list, degree_list)]).T
+    return B, max_degree
+
+
+def cons_poly_eval_matrix(B, max_degree, data_ind_out, data_ind_bounds):
+    """
+    Evaluates all the polynomials in the poly_coeff_matrix B (see poly_coeff_matrix) at the data_ind_out, with one single matrix product.
+    :return: data_dep_out. Shape (n_polynomials, n_out_data)
+    """
+    n_ind_var = data_ind_out.shape[0]
+    data_ind_out_01 = np.array([(data_ind_out[n, :] - data_ind_bounds[n, 0]) / (data_ind_bounds[n, -1] - data_ind_bounds[n, 0]) for n in range(n_ind_var)])
+    return (poly_A_rows(data_ind_out_01, max_degree) @ B).T
+
+
+def cons_poly_eval_multi(poly_coeff_list, degree_list, data_ind_out, data_ind_bounds):
+    """
+    Evaluates several polynomials (e.g. one per aerodynamic coefficient) at the same data_ind_out, with one single matrix product.
+    The coefficients are padded to the highest degree, so that the A matrix is only built once.
+    :return: data_dep_out. Shape (len(poly_coeff_list), n_out_data)
+    """
+    B, max_degree = poly_coeff_matrix(poly_coeff_list, degree_list, n_ind_var=data_ind_out.shape[0])
+    return cons_poly_eval_matrix(B, max_degree, data_ind_out, data_ind_bounds)
@@ -1,22 +1,33 @@
 import numpy as np
-import pandas as pd
+import xlsxwriter  # You need to: pip install xlsxwriter
 import os
+from concurrent.futures import ThreadPoolExecutor
 from buffeting import C_Ci_func
-from my_utils import deg, rad, root_dir
+from my_utils import root_dir
 
 folder_path = os.path.join(root_dir, r'aerodynamic_coefficients\tables')
 
 beta_step = 1  # deg
 theta_step = 1  # deg
 
-beta = rad(np.arange(-180, 180+beta_step, beta_step))
-theta = rad(np.arange(-12, 12+theta_step, theta_step))
+n_beta = round(360 / beta_step) + 1  # linspace with integer counts, instead of arange, keeps both end points for any step
+n_theta = round(24 / theta_step) + 1
+beta = np.deg2rad(np.linspace(-180, 180, n_beta))
+theta = np.deg2rad(np.linspace(-12, 12, n_theta))
 
 method = '2D_fit_cons_polimi-K12-G-L-TS-SVV'  # 'cos_rule_aero_coefs_Ls_2D_fit_cons_polimi-K12-G-L-TS-SVV.xlsx' # "2D_fit_cons_w_CFD_scale_to_Jul"
 # method = '2D_fit_cons_polimi-K12-G-L-SVV'  # "2D_fit_cons_w_CFD_scale_to_Jul"
 
 coor_system = 'Ls'  # Ls or Gw
 n_aero_coef = 4  # Choose 4 to neglect Cry and Crz
+n_decimals = 6  # Values are rounded to n_decimals before writing, giving shorter numbers in the xlsx file. None to keep full precision
+n_workers = 1  # 1 evaluates the table in one single call. >1: number of threads, each evaluating a block of theta rows (opt-in, no gain measured so far)
+use_cache = False  # True reuses the coefficients saved by a previous run with the same method and grid. The cache does NOT know about changes in the
+                   # measurement data or in the fit settings (degrees, constraints, factors in aero_coefficients.py): only use it if none changed
+cache_path = os.path.join(root_dir, 'intermediate_results', f'C_Ci_table_{coor_system}_{method}_{n_aero_coef}_coefs.npz')
+xlsx_in_memory = True  # True: the xlsx file is assembled in memory, without temporary files. False: constant_memory mode, for very large tables
+write_xlsx = True  # The table is always saved as .npz (read by aero_coef_table_method, if not older than the xlsx). False to skip the (slower) xlsx file
+table_path = os.path.join(folder_path, 'aero_coefs_'+f'{coor_system}_{method}'+'.xlsx')
 
 if coor_system == 'Ls':
     d_keys = ['betas_deg', 'thetas_deg', 'Cx', 'Cy', 'Cz', 'Crx', 'Cry', 'Crz']
@@ -24,25 +35,58 @@ elif coor_system == 'Gw':
     d_keys = ['betas_deg', 'thetas_deg', 'CXu', 'CYv', 'CZw', 'CrXu', 'CrYv', 'CrZw']
 else:
     raise NotImplementedError
-d = {key: [] for key in d_keys}
-
-for t in list(reversed(theta)):
-    arr_equal_thetas = t * np.ones(len(beta))
-    Ci_row = C_Ci_func(beta=beta, theta=arr_equal_thetas, aero_coef_method=method, n_aero_coef=n_aero_coef,
-                       coor_system=coor_system)
-
-    d['betas_deg'].append(deg(beta))
-    d['thetas_deg'].append(deg(arr_equal_thetas))
-    for i, label in enumerate(d_keys[2:]):
-        assert 'C' in label
-        d[label].append(Ci_row[i])
-
-writer = pd.ExcelWriter(os.path.join(folder_path, 'aero_coefs_'+f'{coor_system}_{method}'+'.xlsx'),
-                        engine='xlsxwriter')  # You need to: pip install xlsxwriter
-for key in d:
-    d[key] = np.array(d[key])
-    df = pd.DataFrame(d[key])
-    df.to_excel(writer, sheet_name=key, index=False, header=False)
-writer.close()
+
+
+def C_Ci_rows_func(betas_rows, thetas_rows):
+    """C_Ci_func for a block of table rows, with shape (6, n_rows, len(beta))"""
+    Ci_rows = C_Ci_func(beta=betas_rows.ravel(), theta=thetas_rows.ravel(), aero_coef_method=method, n_aero_coef=n_aero_coef,
+                        coor_system=coor_system)
+    return Ci_rows.reshape((6,) + betas_rows.shape)
+
+
+# All the (beta, theta) points. Table rows have the thetas in descending order, columns have the betas
+thetas_desc = theta[::-1]  # a view, no copy. Used both for the grid and for the thetas_deg axis, so that they always match
+betas_grid, thetas_grid = np.meshgrid(beta, thetas_desc)  # shape (len(theta), len(beta))
+Ci_all = None
+if use_cache and os.path.isfile(cache_path):
+    with np.load(cache_path) as cache:
+        if np.array_equal(cache['beta'], beta) and np.array_equal(cache['theta'], theta):  # otherwise, the grid has changed
+            Ci_all = cache['Ci_all']
+            print(f'Using previously existing table of aerodynamic coefficients: {cache_path}')
+if Ci_all is None:
+    if n_workers == 1:
+        Ci_all = C_Ci_rows_func(betas_grid, thetas_grid)
+    else:
+        # One row is evaluated first, so that the (cached) polynomial fits are done only once, before the threads start
+        C_Ci_rows_func(betas_grid[:1], thetas_grid[:1])
+        row_blocks = [rows for rows in np.array_split(np.arange(len(theta)), n_workers) if rows.size]
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            Ci_blocks = list(executor.map(lambda rows: C_Ci_rows_func(betas_grid[rows], thetas_grid[rows]), row_blocks))
+        Ci_all = np.concatenate(Ci_blocks, axis=1)
+    if use_cache:
+        np.savez(cache_path, beta=beta, theta=theta, Ci_all=Ci_all)
+
+# The angles are only stored as the table axes: betas_deg as one single row, thetas_deg (descending) as one single column.
+# (Readers, e.g. aero_coef_table_method, use np.unique. Use np.broadcast_to(d['betas_deg'], betas_grid.shape) for the full grids)
+# The coefficients stay in one contiguous array, with shape (6, len(theta), len(beta)), and d only holds views of each of them
+Ci_table = Ci_all if n_decimals is None else np.round(Ci_all, n_decimals)
+d = {'betas_deg': np.rad2deg(beta)[None, :],
+     'thetas_deg': np.rad2deg(thetas_desc)[:, None]}
+for i, label in enumerate(d_keys[2:]):
+    assert 'C' in label
+    d[label] = Ci_table[i]
+
+# Writing directly with xlsxwriter (no pandas DataFrames), to one workbook that is only closed at the end. (in_memory overrides
+# constant_memory). In constant_memory mode each row is flushed to a temporary file once the next row is started, so the
+# tables are written row by row, in order.
+if write_xlsx:
+    workbook = xlsxwriter.Workbook(table_path, {'in_memory': xlsx_in_memory, 'constant_memory': not xlsx_in_memory})
+    for key in d:
+        worksheet = workbook.add_worksheet(key)
+        for row_idx, row in enumerate(d[key]):
+            worksheet.write_row(row_idx, 0, row.tolist())
+    workbook.close()
+# Saved after the xlsx file, since aero_coef_table_method only reads the .npz if it is at least as new as the xlsx
+np.savez(os.path.splitext(table_path)[0] + '.npz', **d)
 
 
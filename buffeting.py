@@ -518,7 +518,6 @@ def C_Ci_func(beta, theta, aero_coef_method, n_aero_coef, coor_system):
     """
     assert beta.ndim == 1
     assert beta.shape == theta.shape
-    beta_num = len(beta)  # Usually == g_node_num. But in Time domain, we may have to flatten betas (for all t) so len(beta)>>g_node_num
 
     # Finding the aerodynamic coefficients in local normal wind coordinate system Lnw:
     # Obtaining the aerodynamic coefficients for each node (represented by beta and theta).
@@ -535,13 +534,12 @@ def C_Ci_func(beta, theta, aero_coef_method, n_aero_coef, coor_system):
     # # From Local normal wind (the same as the Lwbar system when rotated by beta back to non-skew position) to Local wind coordinates.
     # C_Ci = np.einsum('nij,jn->ni', T_LwLnw, np.array([Cx_Lnw, Cy_Lnw, Cz_Lnw, Cxx_Lnw, Cyy_Lnw, Czz_Lnw])).transpose() # See L.D.Zhu thesis eq(4-25b).
     if '2D' not in coor_system:
-        Cx_Ls, Cy_Ls, Cz_Ls, Cxx_Ls, Cyy_Ls, Czz_Ls = aero_coef(copy.deepcopy(beta), copy.deepcopy(theta), method=aero_coef_method, coor_system='Ls')
-        # Reducing the number of aerodynamic coefficients if desired:
+        C_Ci_Ls = aero_coef(beta, theta, method=aero_coef_method, coor_system='Ls')  # new array with shape (6, beta_num)
+        # Reducing the number of aerodynamic coefficients if desired (in-place, rows are Cx, Cy, Cz, Cxx, Cyy, Czz):
         if n_aero_coef == 3:  # then only: Drag, Lift and Moment
-            Cx_Ls, Cyy_Ls, Czz_Ls = np.zeros((3, beta_num))
+            C_Ci_Ls[[0, 4, 5]] = 0.
         elif n_aero_coef == 4:  # then only: Drag, Lift, Moment and Axial
-            Cyy_Ls, Czz_Ls = np.zeros((2, beta_num))
-        C_Ci_Ls = np.array([Cx_Ls, Cy_Ls, Cz_Ls, Cxx_Ls, Cyy_Ls, Czz_Ls])
+            C_Ci_Ls[4:] = 0.
     if coor_system == 'Ls':
         return C_Ci_Ls
     elif coor_system == 'Gw':
@@ -577,7 +575,6 @@ def C_Ci_derivatives_func(beta, theta, aero_coef_method, n_aero_coef, coor_syste
     assert beta.ndim == 1
     assert beta.shape == theta.shape
     assert n_aero_coef in [3, 4, 6], "n_aero_coef needs to be 3, 4 or 6"
-    beta_num = len(beta)
 
     # # OLD VERSION, IN Lnw COORDINATES.
     # # Transformation matrix
@@ -596,16 +593,14 @@ def C_Ci_derivatives_func(beta, theta, aero_coef_method, n_aero_coef, coor_syste
 
     # Finding the aerodynamic coefficient derivatives in local structural coordinate system, for each node:
     if '2D Lnw' not in coor_system:  # if Lnw, then other coefficients, for all beta=0, need to be obtained instead.
-        [Cx_Ls_dbeta, Cy_Ls_dbeta, Cz_Ls_dbeta, Cxx_Ls_dbeta, Cyy_Ls_dbeta, Czz_Ls_dbeta],\
-        [Cx_Ls_dtheta, Cy_Ls_dtheta, Cz_Ls_dtheta, Cxx_Ls_dtheta, Cyy_Ls_dtheta, Czz_Ls_dtheta] =\
-            aero_coef_derivatives(copy.deepcopy(beta), copy.deepcopy(theta), method=aero_coef_method, coor_system='Ls')
-        # Reducing the number of aerodynamic coefficients if desired:
+        C_Ci_Ls_dbeta, C_Ci_Ls_dtheta = aero_coef_derivatives(beta, theta, method=aero_coef_method, coor_system='Ls')  # each with shape (6, beta_num)
+        # Reducing the number of aerodynamic coefficients if desired (in-place, rows are Cx, Cy, Cz, Cxx, Cyy, Czz):
         if n_aero_coef == 3:  # then only: Drag, Lift and Moment
-            Cx_Ls_dbeta, Cx_Ls_dtheta, Cyy_Ls_dbeta, Cyy_Ls_dtheta, Czz_Ls_dbeta, Czz_Ls_dtheta = np.zeros((6,beta_num))
+            C_Ci_Ls_dbeta[[0, 4, 5]] = 0.
+            C_Ci_Ls_dtheta[[0, 4, 5]] = 0.
         elif n_aero_coef == 4:  # then only: Drag, Lift, Moment and Axial
-            Cyy_Ls_dbeta, Cyy_Ls_dtheta, Czz_Ls_dbeta, Czz_Ls_dtheta = np.zeros((4,beta_num))
-        C_Ci_Ls_dbeta = np.array([Cx_Ls_dbeta, Cy_Ls_dbeta, Cz_Ls_dbeta, Cxx_Ls_dbeta, Cyy_Ls_dbeta, Czz_Ls_dbeta])
-        C_Ci_Ls_dtheta = np.array([Cx_Ls_dtheta, Cy_Ls_dtheta, Cz_Ls_dtheta, Cxx_Ls_dtheta, Cyy_Ls_dtheta, Czz_Ls_dtheta])
+            C_Ci_Ls_dbeta[4:] = 0.
+            C_Ci_Ls_dtheta[4:] = 0.
 
     if coor_system == 'Ls':
         return C_Ci_Ls_dbeta, C_Ci_Ls_dtheta
@@ -625,7 +620,7 @@ def C_Ci_derivatives_func(beta, theta, aero_coef_method, n_aero_coef, coor_syste
         return C_Ci_Lw_dbeta, C_Ci_Lw_dtheta
     elif coor_system == '2D Lnw':  # Local normal wind
         thetayz = theta_yz_bar_func(beta, theta)
-        _, C_Ci_Ls_dthetayz = aero_coef_derivatives(np.zeros(beta.shape), copy.deepcopy(thetayz), method=aero_coef_method, coor_system='Ls')  # using beta = 0, so that theta = thetayz
+        _, C_Ci_Ls_dthetayz = aero_coef_derivatives(np.zeros(beta.shape), thetayz, method=aero_coef_method, coor_system='Ls')  # using beta = 0, so that theta = thetayz
         C_Ci_Ls_beta0 = aero_coef(np.zeros(beta.shape), thetayz, method=aero_coef_method, coor_system='Ls')  # function of (b=0, theta_yz)
         T_LnwLs_dthetayz = T_LnwLs_dtheta_yz_func(thetayz, dim='6x6')
         T_LnwLs_6 = T_LnwLs_func(beta, thetayz, dim='6x6')